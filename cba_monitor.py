@@ -14,7 +14,13 @@ import requests
 import json
 import re
 import os
-from datetime import datetime, timedelta
+import hashlib
+import zipfile
+import heapq
+import time
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from http.server import HTTPServer, BaseHTTPRequestHandler
 from zoneinfo import ZoneInfo
 from bs4 import BeautifulSoup
 from config import (
@@ -24,6 +30,11 @@ from config import (
     NOTIFICATION_HOUR,
 )
 
+try:
+    from config import SUBSCRIBERS
+except ImportError:
+    SUBSCRIBERS = None
+
 # 时区定义
 TZ_BEIJING = ZoneInfo("Asia/Shanghai")
 TZ_TORONTO = ZoneInfo("America/Toronto")
@@ -37,6 +48,32 @@ CBA_SCHEDULE_URLS = {
 # 赛程更新间隔（天）
 SCHEDULE_UPDATE_INTERVAL = 7  # 每周更新一次
 
+# iCalendar订阅源
+ICS_FILE = "cba_calendar.ics"
+ICS_CACHE_FILE = "ics_cache.json"
+ICS_GAME_DURATION = timedelta(hours=2, minutes=30)  # 日历中每场比赛占用的时长
+ICS_SERVER_PORT = 8787
+
+# 提醒调度器
+DEFAULT_SUBSCRIBER_TIMEZONE = "America/Toronto"
+SCHEDULER_POLL_SECONDS = 60  # 调度器最长休眠时间，用于及时发现赛程变化
+REMINDER_RETRY_SECONDS = 300  # 提醒发送失败后的重试间隔
+
+# 历史战绩归档（列式存储）
+RESULTS_ARCHIVE_FILE = "results_archive.npz"
+RESULTS_COLUMNS = {
+    'day': np.int32,         # 比赛日期（公历序数，date.toordinal()）
+    'season': np.int16,      # 赛季起始年份，如 2025-2026 赛季为 2025
+    'home': np.int16,        # 主队编号
+    'away': np.int16,        # 客队编号
+    'home_score': np.int16,
+    'away_score': np.int16,
+}
+RECENT_FORM_GAMES = 5  # 近期状态统计的场数
+
+# 中文星期
+WEEKDAYS_CN = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+
 
 class CBAMonitor:
     """CBA比赛监控类"""
@@ -48,6 +85,9 @@ class CBAMonitor:
         self.schedule_file = "schedule.json"
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         self.schedule_path = os.path.join(self.script_dir, self.schedule_file)
+        self.archive = ResultsArchive(os.path.join(self.script_dir, RESULTS_ARCHIVE_FILE),
+                                      self.team_names, log=self.log)
+        self.web_results = []  # 网络获取到的所有球队已结束比赛（用于归档）
     
     def log(self, msg):
         """打印带时间戳的日志"""
@@ -114,6 +154,7 @@ class CBAMonitor:
     def fetch_schedule_from_web(self):
         """从网页爬取赛程数据"""
         all_games = []
+        self.web_results = []
         
         # 尝试从CBA官网获取
         try:
@@ -237,6 +278,13 @@ class CBAMonitor:
                     'broadcast': item.get('broadcast', item.get('tv', '')),
                 }
                 
+                # 已结束的比赛记录比分（所有球队），用于历史战绩归档
+                home_score = item.get('homeScore', item.get('home_score'))
+                away_score = item.get('awayScore', item.get('away_score'))
+                result = dict(game, home_score=home_score, away_score=away_score)
+                if ResultsArchive.final_result(result):
+                    self.web_results.append(result)
+                
                 # 检查是否是目标球队
                 if self._is_target_team_game(game):
                     games.append(game)
@@ -388,6 +436,9 @@ class CBAMonitor:
             local_data = self.load_local_schedule()
             local_games = local_data.get('games', [])
             
+            # 过期比赛会被丢弃，先归档已有比分的比赛
+            self.archive_results(self.web_results + local_games)
+            
             # 合并数据（保留本地手动添加的比赛）
             merged_games = web_games.copy()
             for local_game in local_games:
@@ -449,6 +500,20 @@ class CBAMonitor:
         
         return tomorrow_games
     
+    def get_game_uid(self, game):
+        """根据比赛身份（日期+主队+客队）生成稳定的UID"""
+        date = game.get('date', '').replace('/', '-')
+        identity = f"{date}|{game.get('home_team', '')}|{game.get('away_team', '')}"
+        digest = hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+        return f"{digest}@cba-monitor"
+    
+    def get_game_kickoff(self, game):
+        """获取比赛开球时间（北京时间，带时区）"""
+        date = game.get('date', '').replace('/', '-')
+        time_str = game.get('time') or '19:35'
+        kickoff = datetime.strptime(f"{date} {time_str}", '%Y-%m-%d %H:%M')
+        return kickoff.replace(tzinfo=TZ_BEIJING)
+    
     def get_broadcast_info(self, game):
         """获取直播信息"""
         if game.get('broadcast'):
@@ -457,6 +522,39 @@ class CBAMonitor:
         # 默认直播平台提示
         return "CCTV-5/CCTV-5+、咪咕视频、央视频、抖音（请以实际播出为准）"
     
+    def archive_results(self, games):
+        """把已有比分的比赛写入历史战绩归档"""
+        count = self.archive.add_results(games)
+        if count > 0 and self.archive.save():
+            self.log(f"归档新增/更正 {count} 场比赛结果，归档共 {len(self.archive)} 场")
+        return count
+    
+    def format_team_stats(self, home, away, date=''):
+        """格式化双方历史战绩（交锋、近期状态、本赛季主客场），无数据时返回空字符串"""
+        archive = self.archive
+        lines = ""
+        
+        wins, losses = archive.head_to_head(home, away)
+        if wins + losses:
+            lines += f"📊 历史交锋: {home} {wins}胜{losses}负\n"
+        
+        forms = [(team, archive.recent_form(team)) for team in (home, away)]
+        forms = [f"{team} {form}" for team, form in forms if form]
+        if forms:
+            lines += f"📈 近{RECENT_FORM_GAMES}场: {' | '.join(forms)}\n"
+        
+        try:
+            season = archive.season_of(datetime.strptime(date.replace('/', '-'), '%Y-%m-%d').date())
+        except ValueError:
+            return lines
+        home_split = archive.home_away_split(home, season)
+        away_split = archive.home_away_split(away, season)
+        if sum(home_split['home']) + sum(away_split['away']):
+            lines += (f"🏠 本赛季: {home} 主场 {home_split['home'][0]}胜{home_split['home'][1]}负 | "
+                      f"{away} 客场 {away_split['away'][0]}胜{away_split['away'][1]}负\n")
+        
+        return lines
+    
     def format_game_message(self, games):
         """格式化比赛通知消息"""
         if not games:
@@ -465,9 +563,7 @@ class CBAMonitor:
         now_beijing = datetime.now(TZ_BEIJING)
         tomorrow_beijing = now_beijing + timedelta(days=1)
         
-        # 中文星期
-        weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
-        weekday_cn = weekdays[tomorrow_beijing.weekday()]
+        weekday_cn = WEEKDAYS_CN[tomorrow_beijing.weekday()]
         
         message = "🏀 <b>CBA比赛提醒</b>\n\n"
         message += f"📅 明天 ({tomorrow_beijing.strftime('%m月%d日')} {weekday_cn}) 有以下比赛：\n\n"
@@ -482,6 +578,7 @@ class CBAMonitor:
             message += f"<b>比赛 {i}</b>\n"
             message += f"⏰ 北京时间: {time}\n"
             message += f"🆚 {away} @ {home}\n"
+            message += self.format_team_stats(home, away, game.get('date', ''))
             if venue:
                 message += f"📍 地点: {venue}\n"
             message += f"📺 直播: {broadcast}\n\n"
@@ -490,11 +587,45 @@ class CBAMonitor:
         
         return message
     
-    def send_telegram_message(self, message):
+    def format_reminder_message(self, game, subscriber):
+        """格式化单个订阅者的比赛提醒（按订阅者当地时间显示）"""
+        kickoff = self.get_game_kickoff(game)
+        local = kickoff.astimezone(subscriber['tz'])
+        home = game.get('home_team', '未知')
+        away = game.get('away_team', '未知')
+        venue = game.get('venue', '')
+        broadcast = self.get_broadcast_info(game)
+        
+        message = "🏀 <b>CBA比赛提醒</b>\n\n"
+        message += f"🆚 {away} @ {home}\n"
+        message += (f"⏰ 当地时间: {local.strftime('%m月%d日')} {WEEKDAYS_CN[local.weekday()]} "
+                    f"{local.strftime('%H:%M')} ({subscriber['timezone']})\n")
+        message += (f"⏰ 北京时间: {kickoff.strftime('%m月%d日')} {WEEKDAYS_CN[kickoff.weekday()]} "
+                    f"{kickoff.strftime('%H:%M')}\n")
+        message += self.format_team_stats(home, away, game.get('date', ''))
+        if venue:
+            message += f"📍 地点: {venue}\n"
+        message += f"📺 直播: {broadcast}\n\n"
+        message += "💡 记得提前调好闹钟！"
+        
+        return message
+    
+    def get_subscribers(self):
+        """获取订阅者列表（未配置 SUBSCRIBERS 时使用默认订阅者）"""
+        if SUBSCRIBERS:
+            return SUBSCRIBERS
+        
+        return [{
+            "chat_id": self.chat_id,
+            "timezone": DEFAULT_SUBSCRIBER_TIMEZONE,
+            "remind_at": f"{NOTIFICATION_HOUR:02d}:00",
+        }]
+    
+    def send_telegram_message(self, message, chat_id=None):
         """发送Telegram消息"""
         url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
         payload = {
-            "chat_id": self.chat_id,
+            "chat_id": chat_id or self.chat_id,
             "text": message,
             "parse_mode": "HTML"
         }
@@ -544,6 +675,575 @@ class CBAMonitor:
         return tomorrow_games
 
 
+class CalendarFeed:
+    """iCalendar订阅源（增量生成）
+    
+    每场比赛的VEVENT按内容指纹缓存在 ics_cache.json 中，只有变化的比赛才会重新渲染；
+    整个订阅源的内容哈希作为ETag，供日历客户端轮询时返回304。
+    """
+    
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.ics_path = os.path.join(monitor.script_dir, ICS_FILE)
+        self.cache_path = os.path.join(monitor.script_dir, ICS_CACHE_FILE)
+        self.cache = self._load_cache()
+    
+    def _load_cache(self):
+        """加载事件缓存"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"events": {}, "etag": None, "schedule_mtime": None}
+    
+    def _save_cache(self):
+        """保存事件缓存"""
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.monitor.log(f"保存日历缓存失败: {e}")
+    
+    @staticmethod
+    def _escape(text):
+        """转义iCalendar文本字段"""
+        return (text.replace('\\', '\\\\')
+                    .replace(';', '\\;')
+                    .replace(',', '\\,')
+                    .replace('\n', '\\n'))
+    
+    @staticmethod
+    def _fold(line):
+        """按RFC 5545将超过75字节的行折叠（按UTF-8字节计算，不拆分汉字）"""
+        if len(line.encode('utf-8')) <= 75:
+            return line
+        
+        parts = []
+        current = ''
+        size = 0
+        limit = 75
+        for ch in line:
+            ch_size = len(ch.encode('utf-8'))
+            if size + ch_size > limit:
+                parts.append(current)
+                current = ''
+                size = 0
+                limit = 74  # 续行以一个空格开头
+            current += ch
+            size += ch_size
+        parts.append(current)
+        return '\r\n '.join(parts)
+    
+    def _fingerprint(self, game, kickoff):
+        """计算比赛内容指纹，用于判断事件是否需要重新渲染"""
+        content = {
+            'kickoff': kickoff.isoformat(),
+            'home_team': game.get('home_team', ''),
+            'away_team': game.get('away_team', ''),
+            'venue': game.get('venue', ''),
+            'broadcast': self.monitor.get_broadcast_info(game),
+        }
+        raw = json.dumps(content, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def _render_event(self, uid, game, kickoff, sequence):
+        """渲染单场比赛的VEVENT"""
+        fmt = '%Y%m%dT%H%M%SZ'
+        start = kickoff.astimezone(timezone.utc)
+        end = start + ICS_GAME_DURATION
+        home = game.get('home_team', '未知')
+        away = game.get('away_team', '未知')
+        venue = game.get('venue', '')
+        broadcast = self.monitor.get_broadcast_info(game)
+        
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTAMP:{datetime.now(timezone.utc).strftime(fmt)}",
+            f"SEQUENCE:{sequence}",
+            f"DTSTART:{start.strftime(fmt)}",
+            f"DTEND:{end.strftime(fmt)}",
+            f"SUMMARY:{self._escape(f'🏀 {away} @ {home}')}",
+        ]
+        if venue:
+            lines.append(f"LOCATION:{self._escape(venue)}")
+        lines.append(f"DESCRIPTION:{self._escape(f'直播: {broadcast}')}")
+        lines.append("END:VEVENT")
+        return '\r\n'.join(self._fold(line) for line in lines)
+    
+    def _assemble(self, events):
+        """拼接完整的日历内容（按开球时间排序）"""
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//CBA-Monitor//CBA Calendar//ZH",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            "X-WR-CALNAME:CBA比赛提醒",
+            "X-WR-TIMEZONE:Asia/Shanghai",
+        ]
+        for event in sorted(events.values(), key=lambda e: e['start']):
+            lines.append(event['vevent'])
+        lines.append("END:VCALENDAR")
+        return '\r\n'.join(lines) + '\r\n'
+    
+    def build(self, games):
+        """增量生成订阅源，只重新渲染有变化的比赛
+        
+        返回 True 表示订阅源内容发生变化并已重写
+        """
+        old_events = self.cache.get('events', {})
+        events = {}
+        changed = 0
+        
+        for game in self.monitor.filter_target_games(games):
+            try:
+                kickoff = self.monitor.get_game_kickoff(game)
+            except ValueError:
+                self.monitor.log(f"比赛时间格式错误，跳过: {game.get('date')} {game.get('time')}")
+                continue
+            
+            uid = self.monitor.get_game_uid(game)
+            fingerprint = self._fingerprint(game, kickoff)
+            cached = old_events.get(uid)
+            if cached and cached['hash'] == fingerprint:
+                events[uid] = cached
+                continue
+            
+            sequence = cached['sequence'] + 1 if cached else 0
+            events[uid] = {
+                'hash': fingerprint,
+                'sequence': sequence,
+                'start': kickoff.astimezone(timezone.utc).isoformat(),
+                'vevent': self._render_event(uid, game, kickoff, sequence),
+            }
+            changed += 1
+        
+        removed = len(set(old_events) - set(events))
+        if not changed and not removed and self.cache.get('etag') and os.path.exists(self.ics_path):
+            self.monitor.log("日历订阅源无变化")
+            return False
+        
+        body = self._assemble(events)
+        try:
+            with open(self.ics_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(body)
+        except Exception as e:
+            self.monitor.log(f"保存日历文件失败: {e}")
+            return False
+        
+        self.cache['events'] = events
+        self.cache['etag'] = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        self._save_cache()
+        self.monitor.log(f"日历订阅源已更新: {changed} 场变化, {removed} 场移除, 共 {len(events)} 场")
+        return True
+    
+    def refresh(self):
+        """确保订阅源为最新并返回ETag
+        
+        schedule.json 未被修改时直接复用缓存的ETag，不重新读取赛程
+        """
+        try:
+            mtime = os.path.getmtime(self.monitor.schedule_path)
+        except OSError:
+            mtime = None
+        
+        if (mtime is not None and mtime == self.cache.get('schedule_mtime')
+                and self.cache.get('etag') and os.path.exists(self.ics_path)):
+            return self.cache['etag']
+        
+        data = self.monitor.load_local_schedule()
+        self.build(data.get('games', []))
+        self.cache['schedule_mtime'] = mtime
+        self._save_cache()
+        return self.cache.get('etag')
+    
+    def read(self):
+        """读取订阅源内容"""
+        with open(self.ics_path, 'rb') as f:
+            return f.read()
+
+
+class ReminderScheduler:
+    """按订阅者时区和提醒方式调度比赛提醒
+    
+    所有 (订阅者, 比赛) 的提醒时刻保存在最小堆中，每次取出/插入为 O(log n)。
+    比赛时间变化时只重新计算该比赛的提醒，旧的堆条目在出堆时惰性丢弃。
+    
+    订阅者提醒方式：
+    - "remind_at": "20:00"  比赛前一天（订阅者当地日期）的指定时间
+    - "lead_minutes": 120   开球前指定分钟数
+    """
+    
+    def __init__(self, monitor, subscribers):
+        self.monitor = monitor
+        self.subscribers = {}  # chat_id -> 订阅者
+        self.games = {}        # uid -> 比赛
+        self.kickoffs = {}     # uid -> 开球时间
+        self._due = {}         # (chat_id, uid) -> 当前有效的提醒时间戳
+        self._heap = []        # (提醒时间戳, chat_id, uid)
+        self._synced = False   # 是否已完成首次同步
+        
+        for subscriber in subscribers:
+            self.add_subscriber(subscriber)
+    
+    def __len__(self):
+        return len(self._due)
+    
+    def add_subscriber(self, subscriber):
+        """添加订阅者，并为已知比赛计算提醒时刻
+        
+        提醒设置无效的订阅者会被忽略并记录日志，返回 False
+        """
+        raw_chat_id = subscriber.get('chat_id')
+        chat_id = '' if raw_chat_id is None else str(raw_chat_id).strip()
+        timezone_name = subscriber.get('timezone', DEFAULT_SUBSCRIBER_TIMEZONE)
+        entry = dict(subscriber, chat_id=chat_id, timezone=timezone_name)
+        
+        try:
+            if not chat_id:
+                raise ValueError("缺少 chat_id")
+            entry['tz'] = ZoneInfo(timezone_name)
+            if entry.get('lead_minutes') is not None:
+                entry['lead_minutes'] = float(entry['lead_minutes'])
+                if entry['lead_minutes'] < 0:
+                    raise ValueError("lead_minutes 不能为负数")
+            else:
+                entry['remind_at'] = entry.get('remind_at') or f"{NOTIFICATION_HOUR:02d}:00"
+                hour, minute = (int(part) for part in entry['remind_at'].split(':'))
+                if not (0 <= hour < 24 and 0 <= minute < 60):
+                    raise ValueError(f"remind_at 超出范围: {entry['remind_at']}")
+                entry['remind_time'] = (hour, minute)
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            self.monitor.log(f"订阅者 {chat_id or '?'} 的提醒设置无效，已忽略: {e}")
+            return False
+        
+        self.subscribers[chat_id] = entry
+        for uid in self.games:
+            self._schedule(chat_id, uid)
+        return True
+    
+    def remove_subscriber(self, chat_id):
+        """移除订阅者（堆中的条目惰性丢弃）"""
+        chat_id = str(chat_id)
+        self.subscribers.pop(chat_id, None)
+        for key in [key for key in self._due if key[0] == chat_id]:
+            del self._due[key]
+    
+    def reminder_time(self, subscriber, kickoff):
+        """计算订阅者对某场比赛的提醒时刻"""
+        if subscriber.get('lead_minutes') is not None:
+            return kickoff - timedelta(minutes=subscriber['lead_minutes'])
+        
+        tz = subscriber['tz']
+        remind_day = kickoff.astimezone(tz).date() - timedelta(days=1)
+        hour, minute = subscriber['remind_time']
+        return datetime(remind_day.year, remind_day.month, remind_day.day,
+                        hour, minute, tzinfo=tz)
+    
+    def _schedule(self, chat_id, uid, catch_up=False):
+        """计算并入堆一条提醒
+        
+        提醒时刻已过时默认跳过；catch_up=True（比赛时间变更）且尚未开球时立即提醒
+        """
+        now = datetime.now(timezone.utc)
+        kickoff = self.kickoffs[uid]
+        due = self.reminder_time(self.subscribers[chat_id], kickoff)
+        
+        if due <= now:
+            if not catch_up or kickoff <= now:
+                self._due.pop((chat_id, uid), None)
+                return
+            due = now
+        
+        timestamp = due.timestamp()
+        self._due[(chat_id, uid)] = timestamp
+        heapq.heappush(self._heap, (timestamp, chat_id, uid))
+    
+    def update_game(self, game, catch_up=True, kickoff=None):
+        """新增或更新一场比赛，只有开球时间变化时才重新计算提醒"""
+        uid = self.monitor.get_game_uid(game)
+        if kickoff is None:
+            kickoff = self.monitor.get_game_kickoff(game)
+        self.games[uid] = game
+        
+        if self.kickoffs.get(uid) == kickoff:
+            return False
+        
+        self.kickoffs[uid] = kickoff
+        for chat_id in self.subscribers:
+            self._schedule(chat_id, uid, catch_up=catch_up)
+        return True
+    
+    def remove_game(self, uid):
+        """移除比赛（堆中的条目惰性丢弃）"""
+        self.games.pop(uid, None)
+        self.kickoffs.pop(uid, None)
+        for chat_id in self.subscribers:
+            self._due.pop((chat_id, uid), None)
+    
+    def sync(self, games):
+        """与赛程同步，只重新计算新增、改期或取消的比赛"""
+        seen = set()
+        changed = 0
+        
+        for game in self.monitor.filter_target_games(games):
+            try:
+                kickoff = self.monitor.get_game_kickoff(game)
+            except ValueError:
+                self.monitor.log(f"比赛时间格式错误，跳过: {game.get('date')} {game.get('time')}")
+                continue
+            # 首次同步时跳过已过的提醒，之后改期/新增的比赛尚未开球则立即补发
+            if self.update_game(game, catch_up=self._synced, kickoff=kickoff):
+                changed += 1
+            seen.add(self.monitor.get_game_uid(game))
+        
+        removed = [uid for uid in self.games if uid not in seen]
+        for uid in removed:
+            self.remove_game(uid)
+        self._synced = True
+        
+        self.monitor.log(f"提醒调度已同步: {changed} 场变化, {len(removed)} 场移除, 待发送 {len(self)} 条")
+        return changed + len(removed)
+    
+    def retry(self, subscriber, game, delay=REMINDER_RETRY_SECONDS):
+        """发送失败的提醒延迟重新入堆
+        
+        订阅者已移除、比赛已取消或已开球时放弃重试，返回 False
+        """
+        chat_id = subscriber['chat_id']
+        uid = self.monitor.get_game_uid(game)
+        kickoff = self.kickoffs.get(uid)
+        now = datetime.now(timezone.utc)
+        if chat_id not in self.subscribers or kickoff is None or kickoff <= now:
+            return False
+        if (chat_id, uid) in self._due:
+            return True  # 期间已因改期重新调度
+        
+        timestamp = min(now + timedelta(seconds=delay), kickoff).timestamp()
+        self._due[(chat_id, uid)] = timestamp
+        heapq.heappush(self._heap, (timestamp, chat_id, uid))
+        return True
+    
+    def _discard_stale(self):
+        """丢弃堆顶已失效的条目"""
+        while self._heap:
+            timestamp, chat_id, uid = self._heap[0]
+            if self._due.get((chat_id, uid)) == timestamp:
+                return
+            heapq.heappop(self._heap)
+    
+    def next_due(self):
+        """返回下一条提醒的时刻（UTC），没有待发送提醒时返回 None"""
+        self._discard_stale()
+        if not self._heap:
+            return None
+        return datetime.fromtimestamp(self._heap[0][0], timezone.utc)
+    
+    def pop_due(self, now=None):
+        """取出所有已到期的提醒，返回 [(订阅者, 比赛), ...]"""
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+        due = []
+        
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now_ts:
+                break
+            _, chat_id, uid = heapq.heappop(self._heap)
+            del self._due[(chat_id, uid)]
+            due.append((self.subscribers[chat_id], self.games[uid]))
+        
+        return due
+
+
+class ResultsArchive:
+    """历史比赛结果归档（列式存储）
+    
+    每一列是一个 NumPy 数组（见 RESULTS_COLUMNS），球队按编号存储，整体保存为 npz 文件。
+    交锋、近期状态、主客场等统计全部通过向量化布尔掩码计算，不需要逐条扫描JSON。
+    """
+    
+    def __init__(self, path, team_names=None, log=print):
+        self.path = path
+        self.team_names = team_names or {}
+        self.log = log
+        self.load_failed = False  # 归档文件无法读取时禁止保存，避免覆盖无法重建的历史数据
+        self.teams = []     # 编号 -> 球队名
+        self.team_ids = {}  # 球队名 -> 编号
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in RESULTS_COLUMNS.items()}
+        self.load()
+    
+    def __len__(self):
+        return len(self.columns['day'])
+    
+    def load(self):
+        """从npz文件加载归档"""
+        if not self.path:
+            return
+        
+        try:
+            with open(self.path, 'rb') as f, np.load(f, allow_pickle=False) as data:
+                teams = [str(name) for name in data['teams']]
+                columns = {name: data[name].astype(dtype) for name, dtype in RESULTS_COLUMNS.items()}
+        except FileNotFoundError:
+            return
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            self.load_failed = True
+            self.log(f"历史战绩归档文件损坏，本次运行不会写入归档: {e}")
+            return
+        
+        self.teams = teams
+        self.columns = columns
+        self.team_ids = {name: i for i, name in enumerate(teams)}
+    
+    def save(self):
+        """保存归档到npz文件（先写临时文件再替换，避免写到一半留下损坏的归档）"""
+        if self.load_failed:
+            self.log(f"历史战绩归档文件无法读取，为避免覆盖已跳过保存，请检查 {self.path}")
+            return False
+        
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, teams=np.array(self.teams, dtype=str), **self.columns)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            self.log(f"保存历史战绩归档失败: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+    
+    @staticmethod
+    def season_of(game_date):
+        """比赛日期所属赛季（CBA赛季10月开始，次年结束）"""
+        return game_date.year if game_date.month >= 8 else game_date.year - 1
+    
+    @staticmethod
+    def final_result(game):
+        """解析已结束比赛的 (日期, 主队得分, 客队得分)
+        
+        今天及以后的比赛、0:0 占位比分和平局都不是有效结果，返回 None
+        """
+        try:
+            home_score = int(game['home_score'])
+            away_score = int(game['away_score'])
+            game_date = datetime.strptime(game.get('date', '').replace('/', '-'), '%Y-%m-%d').date()
+        except (KeyError, TypeError, ValueError):
+            return None
+        
+        if game_date >= datetime.now(TZ_BEIJING).date() or home_score == away_score:
+            return None
+        return game_date, home_score, away_score
+    
+    def canonical_team(self, name):
+        """把球队别名统一为配置中的球队名"""
+        for team_key, aliases in self.team_names.items():
+            if name == team_key or name in aliases:
+                return team_key
+        return name
+    
+    def team_id(self, name, create=False):
+        """获取球队编号，create=True 时为新球队分配编号"""
+        name = self.canonical_team(name)
+        if name not in self.team_ids and create:
+            self.team_ids[name] = len(self.teams)
+            self.teams.append(name)
+        return self.team_ids.get(name)
+    
+    def add_results(self, games):
+        """批量加入已结束比赛的结果（同一天同一对阵以新数据为准）
+        
+        返回新增或比分有更正的场数，为 0 时归档内容没有变化
+        """
+        before = len(self)
+        old = self.columns
+        rows = []
+        for game in games:
+            result = self.final_result(game)
+            if not result:
+                continue
+            game_date, home_score, away_score = result
+            home, away = game.get('home_team', ''), game.get('away_team', '')
+            if not home or not away:
+                continue
+            rows.append((game_date.toordinal(), self.season_of(game_date),
+                         self.team_id(home, create=True), self.team_id(away, create=True),
+                         home_score, away_score))
+        
+        if not rows:
+            return 0
+        
+        new = np.array(rows, dtype=np.int64)
+        combined = {
+            name: np.concatenate([self.columns[name], new[:, i].astype(dtype)])
+            for i, (name, dtype) in enumerate(RESULTS_COLUMNS.items())
+        }
+        
+        # 按 (日期, 主队, 客队) 去重，保留最后出现的记录；np.unique 的结果同时按日期排好序
+        keys = ((combined['day'].astype(np.int64) << 32)
+                | (combined['home'].astype(np.int64) << 16)
+                | combined['away'].astype(np.int64))
+        _, first_in_reversed = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - first_in_reversed
+        self.columns = {name: column[keep] for name, column in combined.items()}
+        
+        # 原有记录与去重后的结果都按键排序，可直接逐行比较比分是否被更正
+        existing = np.isin(keys[keep], keys[:before])
+        corrected = np.count_nonzero(
+            (self.columns['home_score'][existing] != old['home_score'])
+            | (self.columns['away_score'][existing] != old['away_score'])
+        )
+        return len(self) - before + int(corrected)
+    
+    def _home_wins(self):
+        return self.columns['home_score'] > self.columns['away_score']
+    
+    def head_to_head(self, team, opponent):
+        """两队历史交锋，返回 (team胜场, team负场)"""
+        t, o = self.team_id(team), self.team_id(opponent)
+        if t is None or o is None:
+            return 0, 0
+        
+        home, away = self.columns['home'], self.columns['away']
+        as_home = (home == t) & (away == o)
+        as_away = (home == o) & (away == t)
+        home_wins = self._home_wins()
+        wins = int(np.count_nonzero(as_home & home_wins) + np.count_nonzero(as_away & ~home_wins))
+        total = int(np.count_nonzero(as_home | as_away))
+        return wins, total - wins
+    
+    def recent_form(self, team, n=RECENT_FORM_GAMES):
+        """最近n场胜负（按时间先后），如 "胜胜负胜负"，无数据时返回空字符串"""
+        t = self.team_id(team)
+        if t is None:
+            return ""
+        
+        is_home = self.columns['home'] == t
+        idx = np.flatnonzero(is_home | (self.columns['away'] == t))[-n:]
+        won = self._home_wins()[idx] == is_home[idx]
+        return ''.join('胜' if w else '负' for w in won)
+    
+    def home_away_split(self, team, season=None):
+        """主客场战绩，返回 {'home': (胜, 负), 'away': (胜, 负)}"""
+        t = self.team_id(team)
+        if t is None:
+            return {'home': (0, 0), 'away': (0, 0)}
+        
+        in_season = True if season is None else self.columns['season'] == season
+        home_games = (self.columns['home'] == t) & in_season
+        away_games = (self.columns['away'] == t) & in_season
+        home_wins = self._home_wins()
+        hw = int(np.count_nonzero(home_games & home_wins))
+        aw = int(np.count_nonzero(away_games & ~home_wins))
+        return {
+            'home': (hw, int(np.count_nonzero(home_games)) - hw),
+            'away': (aw, int(np.count_nonzero(away_games)) - aw),
+        }
+
+
 def test_connection():
     """测试连接"""
     print("=" * 50)
@@ -640,6 +1340,244 @@ def update_schedule():
     print("\n" + "=" * 50)
 
 
+def generate_calendar():
+    """生成日历订阅源"""
+    print("=" * 50)
+    print("CBA比赛监控系统 - 生成日历订阅源")
+    print("=" * 50)
+    
+    monitor = CBAMonitor()
+    monitor.update_schedule()
+    feed = CalendarFeed(monitor)
+    etag = feed.refresh()
+    
+    if etag:
+        print(f"\n✅ 日历文件: {feed.ics_path}")
+        print(f"   ETag: {etag}")
+    else:
+        print("\n❌ 日历订阅源生成失败")
+    
+    print("\n" + "=" * 50)
+
+
+def serve_calendar(port=ICS_SERVER_PORT):
+    """以HTTP方式提供日历订阅源，支持 If-None-Match 返回304"""
+    monitor = CBAMonitor()
+    feed = CalendarFeed(monitor)
+    
+    class CalendarHandler(BaseHTTPRequestHandler):
+        def _respond(self, with_body):
+            if self.path.split('?')[0] not in ('/', f'/{ICS_FILE}'):
+                self.send_error(404)
+                return
+            
+            etag = feed.refresh()
+            if not etag:
+                self.send_error(503)
+                return
+            
+            quoted = f'"{etag}"'
+            if_none_match = self.headers.get('If-None-Match', '')
+            candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            if quoted in candidates or '*' in candidates:
+                self.send_response(304)
+                self.send_header('ETag', quoted)
+                self.end_headers()
+                return
+            
+            body = feed.read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/calendar; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', quoted)
+            self.end_headers()
+            if with_body:
+                self.wfile.write(body)
+        
+        def do_GET(self):
+            self._respond(with_body=True)
+        
+        def do_HEAD(self):
+            self._respond(with_body=False)
+        
+        def log_message(self, format, *args):
+            monitor.log(f"[ICS] {self.address_string()} {format % args}")
+    
+    server = HTTPServer(('0.0.0.0', port), CalendarHandler)
+    monitor.log(f"日历订阅服务已启动: http://0.0.0.0:{port}/{ICS_FILE}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        monitor.log("日历订阅服务已停止")
+    finally:
+        server.server_close()
+
+
+def run_scheduler():
+    """常驻运行提醒调度器，按每个订阅者的时区推送提醒"""
+    monitor = CBAMonitor()
+    scheduler = ReminderScheduler(monitor, monitor.get_subscribers())
+    monitor.log(f"提醒调度器已启动，共 {len(scheduler.subscribers)} 个订阅者")
+    
+    last_mtime = None
+    last_update_day = None
+    
+    try:
+        while True:
+            # 每天检查一次是否需要从网络更新赛程
+            today = datetime.now(TZ_BEIJING).date()
+            if today != last_update_day:
+                monitor.update_schedule()
+                last_update_day = today
+            
+            # schedule.json 变化时增量同步
+            try:
+                mtime = os.path.getmtime(monitor.schedule_path)
+            except OSError:
+                mtime = None
+            if mtime != last_mtime:
+                scheduler.sync(monitor.load_local_schedule().get('games', []))
+                last_mtime = mtime
+            
+            for subscriber, game in scheduler.pop_due():
+                monitor.log(f"🏀 提醒 {subscriber['chat_id']}: {game.get('away_team')} @ {game.get('home_team')}")
+                message = monitor.format_reminder_message(game, subscriber)
+                if monitor.send_telegram_message(message, chat_id=subscriber['chat_id']):
+                    continue
+                if scheduler.retry(subscriber, game):
+                    monitor.log(f"提醒发送失败，{REMINDER_RETRY_SECONDS} 秒后重试: {subscriber['chat_id']}")
+                else:
+                    monitor.log(f"[错误] 提醒未能送达（比赛已开始或已取消）: {subscriber['chat_id']} "
+                                f"{game.get('date')} {game.get('away_team')} @ {game.get('home_team')}")
+            
+            wait = SCHEDULER_POLL_SECONDS
+            next_due = scheduler.next_due()
+            if next_due:
+                wait = min(wait, max(0, (next_due - datetime.now(timezone.utc)).total_seconds()))
+            time.sleep(wait)
+    except KeyboardInterrupt:
+        monitor.log("提醒调度器已停止")
+
+
+def import_results(path):
+    """从JSON文件导入历史比赛结果（比赛列表，或与 schedule.json 相同格式）"""
+    print("=" * 50)
+    print("CBA比赛监控系统 - 导入历史战绩")
+    print("=" * 50)
+    
+    monitor = CBAMonitor()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"\n❌ 读取文件失败: {e}")
+        return
+    
+    games = data.get('games', []) if isinstance(data, dict) else data
+    count = monitor.archive_results(games)
+    print(f"\n✅ 新增/更正 {count} 场比赛结果，归档共 {len(monitor.archive)} 场、{len(monitor.archive.teams)} 支球队")
+    print("\n" + "=" * 50)
+
+
+def show_team_stats(team, opponent=None):
+    """查询球队历史战绩"""
+    monitor = CBAMonitor()
+    archive = monitor.archive
+    team = archive.canonical_team(team)
+    
+    print(f"🏀 {team}")
+    form = archive.recent_form(team)
+    print(f"📈 近{RECENT_FORM_GAMES}场: {form or '暂无数据'}")
+    split = archive.home_away_split(team)
+    print(f"🏠 主场: {split['home'][0]}胜{split['home'][1]}负")
+    print(f"✈️ 客场: {split['away'][0]}胜{split['away'][1]}负")
+    if opponent:
+        opponent = archive.canonical_team(opponent)
+        wins, losses = archive.head_to_head(team, opponent)
+        print(f"📊 对阵{opponent}: {wins}胜{losses}负")
+
+
+def benchmark_archive(seasons=12, teams=20):
+    """历史战绩统计性能测试：列式归档 vs 逐条扫描JSON"""
+    import random
+    
+    print("=" * 50)
+    print(f"历史战绩性能测试 - {seasons} 个赛季, {teams} 支球队")
+    print("=" * 50)
+    
+    # 生成模拟赛程：每赛季双循环
+    rng = random.Random(2025)
+    team_names = [f"球队{i:02d}" for i in range(teams)]
+    games = []
+    for season in range(2025 - seasons, 2025):
+        day = datetime(season, 10, 15)
+        for home in team_names:
+            for away in team_names:
+                if home == away:
+                    continue
+                games.append({
+                    'date': (day + timedelta(days=rng.randrange(180))).strftime('%Y-%m-%d'),
+                    'home_team': home,
+                    'away_team': away,
+                    'home_score': rng.randint(80, 130),
+                    'away_score': rng.randint(80, 130),
+                })
+    for game in games:
+        if game['home_score'] == game['away_score']:
+            game['home_score'] += 1
+    # 与归档相同的顺序（日期、主队、客队），保证两边的近期状态可比
+    games.sort(key=lambda g: (g['date'], g['home_team'], g['away_team']))
+    raw = json.dumps(games, ensure_ascii=False)
+    
+    archive = ResultsArchive(None)  # 仅在内存中测试
+    for name in team_names:
+        archive.team_id(name, create=True)
+    start = time.perf_counter()
+    archive.add_results(games)
+    print(f"\n共 {len(archive)} 场比赛，建立归档耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+    
+    team, opponent = team_names[0], team_names[1]
+    season = 2024
+    season_start, season_end = f"{season}-08-01", f"{season + 1}-08-01"
+    
+    def scan_json():
+        wins = losses = 0
+        form = []
+        split = {'home': [0, 0], 'away': [0, 0]}
+        for game in json.loads(raw):
+            if team not in (game['home_team'], game['away_team']):
+                continue
+            at_home = game['home_team'] == team
+            won = (game['home_score'] > game['away_score']) == at_home
+            form.append(won)
+            if opponent in (game['home_team'], game['away_team']):
+                wins += won
+                losses += not won
+            if season_start <= game['date'] < season_end:
+                split['home' if at_home else 'away'][0 if won else 1] += 1
+        return ((wins, losses),
+                ''.join('胜' if w else '负' for w in form[-RECENT_FORM_GAMES:]),
+                {side: tuple(record) for side, record in split.items()})
+    
+    def query_archive():
+        return (archive.head_to_head(team, opponent),
+                archive.recent_form(team),
+                archive.home_away_split(team, season))
+    
+    expected, actual = scan_json(), query_archive()
+    assert expected == actual, f"统计结果不一致: JSON {expected} / 归档 {actual}"
+    print(f"结果一致: 交锋 {actual[0]}, 近{RECENT_FORM_GAMES}场 {actual[1]}, {season}赛季主客场 {actual[2]}")
+    
+    for label, func, rounds in (("逐条扫描JSON", scan_json, 20), ("列式归档", query_archive, 2000)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        elapsed = (time.perf_counter() - start) / rounds
+        print(f"{label}: 每次查询 {elapsed * 1e6:.1f} µs")
+    
+    print("\n" + "=" * 50)
+
+
 if __name__ == "__main__":
     import sys
     
@@ -654,12 +1592,32 @@ if __name__ == "__main__":
             monitor.run_once()
         elif cmd == "update":
             update_schedule()
+        elif cmd == "ics":
+            if len(sys.argv) > 2 and sys.argv[2] == "serve":
+                port = int(sys.argv[3]) if len(sys.argv) > 3 else ICS_SERVER_PORT
+                serve_calendar(port)
+            else:
+                generate_calendar()
+        elif cmd == "schedule":
+            run_scheduler()
+        elif cmd == "archive" and len(sys.argv) > 2:
+            import_results(sys.argv[2])
+        elif cmd == "stats" and len(sys.argv) > 2:
+            show_team_stats(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        elif cmd == "bench":
+            benchmark_archive(int(sys.argv[2]) if len(sys.argv) > 2 else 12)
         else:
             print("用法:")
             print("  python cba_monitor.py test     # 测试连接")
             print("  python cba_monitor.py notify   # 测试通知")
             print("  python cba_monitor.py once     # 检查比赛并推送")
             print("  python cba_monitor.py update   # 强制更新赛程")
+            print("  python cba_monitor.py ics      # 生成日历订阅源")
+            print("  python cba_monitor.py ics serve [端口]  # 启动日历订阅服务")
+            print("  python cba_monitor.py schedule # 常驻运行按时区提醒的调度器")
+            print("  python cba_monitor.py archive <文件.json>  # 导入历史比赛结果")
+            print("  python cba_monitor.py stats <球队> [对手]  # 查询历史战绩")
+            print("  python cba_monitor.py bench [赛季数]       # 历史战绩统计性能测试")
     else:
         monitor = CBAMonitor()
         monitor.run_once()
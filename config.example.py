@@ -36,6 +36,17 @@ TEAM_NAMES = {
 # 默认晚上8点（20:00）
 NOTIFICATION_HOUR = 20
 
+# 订阅者（可选，供 `python cba_monitor.py schedule` 使用）
+# 每个订阅者可以设置自己的时区和提醒方式：
+#   "remind_at": "20:00"  -> 比赛前一天（订阅者当地日期）20:00 提醒
+#   "lead_minutes": 120   -> 开球前2小时提醒
+# 不配置时默认只提醒 TELEGRAM_CHAT_ID，多伦多时间前一天 NOTIFICATION_HOUR 点
+SUBSCRIBERS = [
+    {"chat_id": TELEGRAM_CHAT_ID, "timezone": "America/Toronto", "remind_at": f"{NOTIFICATION_HOUR:02d}:00"},
+    # {"chat_id": "another_chat_id", "timezone": "America/Vancouver", "lead_minutes": 120},
+    # {"chat_id": "another_chat_id", "timezone": "Asia/Shanghai", "remind_at": "21:00"},
+]
+
 # 监控的赛季
 SEASON = "2025-2026"
 